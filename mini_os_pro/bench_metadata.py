@@ -0,0 +1,85 @@
+"""
+Замер метаданных: старый fs_meta.json (словари) против колонок OwnerFiles + fs_meta.bin.
+
+Запуск из каталога mini_os_pro:
+    python bench_metadata.py [число_файлов]   (по умолчанию 300000)
+
+Всё хранится в MemoryBackend, на диск ничего не пишется.
+"""
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from filesystem import ProFileSystem
+from storage import MemoryBackend
+
+OWNERS = 10
+
+
+def make_legacy_json(n_files: int) -> bytes:
+    """fs_meta.json в старом формате: словарь на каждый файл."""
+    per_owner = max(1, n_files // OWNERS)
+    data = {}
+    for u in range(OWNERS):
+        owner = f"user{u}"
+        data[owner] = {
+            f"docs/file{i}.txt": {
+                "path": f"data/{owner}/docs/file{i}.txt",
+                "size": i % 5000,
+                "created": 1767725636.9142616 + i,
+                "modified": 1767725636.9142616 + i,
+                "owner": owner,
+                "readonly": False,
+            }
+            for i in range(per_owner)
+        }
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def timed(fn):
+    gc.collect()
+    t = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t
+
+
+def traced_bytes(fn) -> int:
+    """Сколько памяти остаётся занято результатом fn()."""
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return used
+
+
+def main():
+    n_files = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    legacy = make_legacy_json(n_files)
+
+    backend = MemoryBackend()
+    backend.write("fs_meta.json", legacy)
+    fs = ProFileSystem(backend=backend)
+    fs.save_metadata()  # миграция: fs_meta.json -> fs_meta.bin
+    binary = backend.read("fs_meta.bin")
+    n = sum(len(files) for files in fs.user_files.values())
+    del fs
+
+    _, t_json = timed(lambda: json.loads(legacy))
+    _, t_bin = timed(lambda: ProFileSystem(backend=backend))
+    m_json = traced_bytes(lambda: json.loads(legacy)) / n
+    m_bin = traced_bytes(lambda: ProFileSystem(backend=backend).user_files) / n
+
+    print(f"файлов: {n}")
+    print(f"{'':18}{'json (dict)':>14}{'bin (колонки)':>18}{'выигрыш':>10}")
+    print(f"{'на диске, МБ':18}{len(legacy) / 1e6:>14.1f}{len(binary) / 1e6:>18.1f}"
+          f"{len(legacy) / len(binary):>9.1f}x")
+    print(f"{'загрузка, с':18}{t_json:>14.2f}{t_bin:>18.2f}{t_json / t_bin:>9.1f}x")
+    print(f"{'память, Б/файл':18}{m_json:>14.0f}{m_bin:>18.0f}{m_json / m_bin:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Сравнение хранилищ ProFileSystem на одном и том же сценарии.
+Замеряется само хранилище, без пересохранения метаданных на каждый файл.
+
+Запуск из каталога mini_os_pro:
+    python bench_storage.py [число_файлов]   (по умолчанию 2000)
+
+LocalDirBackend и SQLiteBackend пишут во временный каталог, который
+удаляется после замера.
+"""
+import sys
+import tempfile
+import time
+
+from storage import LocalDirBackend, MemoryBackend, SQLiteBackend, StorageBackend
+
+USER = "bench"
+CONTENT = "x" * 1024
+
+
+def run(backend: StorageBackend, n_files: int) -> dict:
+    """Один сценарий для всех хранилищ; время в мкс на файл (browse — в мс)."""
+    names = [f"docs/file{i}.txt" for i in range(n_files)]
+    result = {}
+
+    t = time.perf_counter()
+    for name in names:
+        backend.write(f"{USER}/{name}", CONTENT.encode("utf-8"))
+    result["write"] = (time.perf_counter() - t) / n_files * 1e6
+
+    t = time.perf_counter()
+    for name in names:
+        backend.read(f"{USER}/{name}")
+    result["read"] = (time.perf_counter() - t) / n_files * 1e6
+
+    t = time.perf_counter()
+    backend.list(f"{USER}/docs")
+    result["browse"] = (time.perf_counter() - t) * 1e3
+
+    t = time.perf_counter()
+    for name in names:
+        backend.delete(f"{USER}/{name}")
+    result["delete"] = (time.perf_counter() - t) / n_files * 1e6
+    return result
+
+
+def main():
+    n_files = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"файлов: {n_files}, размер: {len(CONTENT)} Б")
+    print(f"{'':10}{'write, мкс':>12}{'read, мкс':>12}{'browse, мс':>12}{'delete, мкс':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = [
+            ("local", LocalDirBackend(f"{tmp}/data")),
+            ("memory", MemoryBackend()),
+            ("sqlite", SQLiteBackend(f"{tmp}/data.sqlite")),
+        ]
+        for name, backend in backends:
+            r = run(backend, n_files)
+            print(f"{name:10}{r['write']:>12.1f}{r['read']:>12.1f}{r['browse']:>12.2f}{r['delete']:>13.1f}")
+        backends[2][1].close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,65 +1,427 @@
+import array
 import json
 import pathlib
-from typing import Optional, Dict, Any, List
+import struct
+import sys
+from collections.abc import Mapping, MutableMapping
+from typing import Optional, Dict, Any, Iterator, List
+
+from storage import LocalDirBackend, StorageBackend
+
+
+# Бинарный формат метаданных (fs_meta.bin), всё little-endian:
+#   заголовок: MAGIC, версия (H), число владельцев (I), число файлов (I)
+#   имена владельцев: длина (I) + utf-8 строки, разделённые '\0'
+#   число файлов каждого владельца: I на владельца
+#   имена файлов:     длина (I) + utf-8 строки, разделённые '\0'
+#   колонки по числу файлов (файлы сгруппированы по владельцам в том же
+#   порядке): size (Q), created (d), modified (d), readonly (B)
+META_MAGIC = b"PFSM"
+META_VERSION = 2
+_META_HEADER = struct.Struct("<4sHII")
+_META_LEN = struct.Struct("<I")
+# Байт на файл в колонках: size + created + modified + readonly
+_META_ROW_SIZE = 8 + 8 + 8 + 1
+
+
+class OwnerFiles(MutableMapping):
+    """
+    Файлы одного владельца в колоночном виде:
+    - size/created/modified/readonly — массивы array (без объекта на каждое поле)
+    - index: filename -> номер строки, names: номер строки -> filename
+    Снаружи выглядит как dict filename -> FileRecord, записи создаются
+    только при обращении. Удаление переносит последнюю строку на место удалённой.
+    """
+
+    __slots__ = ("backend", "owner", "names", "index", "sizes", "created", "modified", "readonly")
+
+    def __init__(self, backend: StorageBackend, owner: str, names: Optional[List[str]] = None,
+                 sizes: Optional[array.array] = None, created: Optional[array.array] = None,
+                 modified: Optional[array.array] = None, readonly: Optional[bytearray] = None):
+        self.backend = backend
+        self.owner = sys.intern(owner)
+        self.names: List[str] = names if names is not None else []
+        self.index: Dict[str, int] = dict(zip(self.names, range(len(self.names))))
+        self.sizes = sizes if sizes is not None else array.array("Q")
+        self.created = created if created is not None else array.array("d")
+        self.modified = modified if modified is not None else array.array("d")
+        self.readonly = readonly if readonly is not None else bytearray()
+
+    def add(self, filename: str, size: int, created: float, modified: float,
+            readonly: bool = False) -> None:
+        """Добавить файл (или перезаписать строку существующего)."""
+        row = self.index.get(filename)
+        if row is None:
+            self.index[filename] = len(self.names)
+            self.names.append(filename)
+            self.sizes.append(size)
+            self.created.append(created)
+            self.modified.append(modified)
+            self.readonly.append(1 if readonly else 0)
+        else:
+            self.sizes[row] = size
+            self.created[row] = created
+            self.modified[row] = modified
+            self.readonly[row] = 1 if readonly else 0
+
+    # ===== dict-совместимость =====
+
+    def __getitem__(self, filename: str) -> "FileRecord":
+        if filename not in self.index:
+            raise KeyError(filename)
+        return FileRecord(self, filename)
+
+    def __setitem__(self, filename: str, record: Mapping) -> None:
+        self.add(filename, record["size"], record["created"], record["modified"],
+                 record["readonly"])
+
+    def __delitem__(self, filename: str) -> None:
+        row = self.index.pop(filename)
+        last = len(self.names) - 1
+        if row != last:
+            moved = self.names[last]
+            self.names[row] = moved
+            self.index[moved] = row
+            for column in (self.sizes, self.created, self.modified, self.readonly):
+                column[row] = column[last]
+        self.names.pop()
+        for column in (self.sizes, self.created, self.modified, self.readonly):
+            del column[last]
+
+    def __contains__(self, filename: object) -> bool:
+        return filename in self.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __repr__(self) -> str:
+        return f"OwnerFiles({self.owner!r}, {len(self)} файлов)"
+
+
+class FileRecord(Mapping):
+    """
+    Запись о файле — лёгкое представление строки OwnerFiles.
+    - поля читаются и пишутся прямо в колонки владельца
+    - key (ключ в хранилище) собирается как owner/filename, а path
+      спрашивается у хранилища (None, если оно не на диске)
+    Ведёт себя как read-only dict со старыми ключами, поэтому код вида
+    record["size"] или f.get('size', 0) продолжает работать.
+    """
+
+    __slots__ = ("_files", "filename")
+
+    KEYS = ("path", "size", "created", "modified", "owner", "readonly")
+    _MUTABLE = frozenset(("size", "created", "modified", "readonly"))
+
+    def __init__(self, files: OwnerFiles, filename: str):
+        self._files = files
+        self.filename = filename
+
+    @property
+    def _row(self) -> int:
+        return self._files.index[self.filename]
+
+    @property
+    def owner(self) -> str:
+        return self._files.owner
+
+    @property
+    def size(self) -> int:
+        return self._files.sizes[self._row]
+
+    @size.setter
+    def size(self, value: int) -> None:
+        self._files.sizes[self._row] = value
+
+    @property
+    def created(self) -> float:
+        return self._files.created[self._row]
+
+    @created.setter
+    def created(self, value: float) -> None:
+        self._files.created[self._row] = value
+
+    @property
+    def modified(self) -> float:
+        return self._files.modified[self._row]
+
+    @modified.setter
+    def modified(self, value: float) -> None:
+        self._files.modified[self._row] = value
+
+    @property
+    def readonly(self) -> bool:
+        return self._files.readonly[self._row] == 1
+
+    @readonly.setter
+    def readonly(self, value: bool) -> None:
+        self._files.readonly[self._row] = 1 if value else 0
+
+    @property
+    def path(self) -> Optional[str]:
+        return self._files.backend.path_for(self.key)
+
+    @property
+    def key(self) -> str:
+        return f"{self.owner}/{self.filename}"
+
+    # ===== dict-совместимость =====
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in self._MUTABLE:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
+    def __repr__(self) -> str:
+        return f"FileRecord({dict(self)!r})"
 
 
 class ProFileSystem:
     """
     Простейшая файловая система для учебной ОС:
-    - реальные файлы лежат в data/<user>/...
-    - метаданные в data/fs_meta.json
+    - содержимое файлов хранит backend (см. storage.py); по умолчанию
+      это обычные файлы в data/<user>/...
+    - метаданные в data/fs_meta.bin (старый data/fs_meta.json читается
+      при первом запуске и удаляется после первого сохранения fs_meta.bin)
     - поддерживает: create, read, update, delete, browse
     """
 
-    def __init__(self, data_dir: str = "data", meta_file: str = "fs_meta.json"):
-        self.data_dir = pathlib.Path(data_dir)
-        self.data_dir.mkdir(exist_ok=True)
-
-        self.meta_path = self.data_dir / meta_file
-        # user_files[owner][filename] = {...meta...}
-        self.user_files: Dict[str, Dict[str, Any]] = {}
+    def __init__(self, data_dir: Optional[str] = None, meta_file: str = "fs_meta.bin",
+                 legacy_meta_file: str = "fs_meta.json",
+                 backend: Optional[StorageBackend] = None):
+        # data_dir нужен только хранилищу по умолчанию (LocalDirBackend);
+        # сам каталог создаётся не здесь, а при первой записи
+        if backend is None:
+            backend = LocalDirBackend(data_dir if data_dir is not None else "data")
+        elif data_dir is not None:
+            raise ValueError("Укажите либо data_dir, либо backend")
+        self.backend = backend
+
+        self.meta_key = meta_file
+        self.legacy_meta_key = legacy_meta_file
+        # user_files[owner][filename] -> FileRecord (см. OwnerFiles)
+        self.user_files: Dict[str, OwnerFiles] = {}
+        # Метаданные не загрузились — сохранять нельзя, иначе затрём их
+        self.metadata_damaged = False
+        # Старый fs_meta.json ещё лежит рядом и будет удалён при сохранении
+        self._legacy_pending = False
 
         self.load_metadata()
 
     # ============ ВНУТРЕННИЕ МЕТОДЫ ============
 
     def load_metadata(self) -> None:
-        """Загрузка метаданных из JSON."""
-        if not self.meta_path.exists():
-            self.user_files = {}
-            return
-
+        """Загрузка метаданных (бинарный формат, либо старый JSON)."""
+        self.user_files = {}
+        self.metadata_damaged = False
         try:
-            data = self.meta_path.read_text(encoding="utf-8")
-            # Если файл пустой
-            if not data.strip():
-                self.user_files = {}
-                return
-            self.user_files = json.loads(data)
+            if self.backend.exists(self.meta_key):
+                self._load_binary(self.backend.read(self.meta_key))
+            elif self.backend.exists(self.legacy_meta_key):
+                self._load_legacy_json(self.backend.read(self.legacy_meta_key).decode("utf-8"))
+            self._legacy_pending = self.backend.exists(self.legacy_meta_key)
         except Exception as e:
             print(f"❌ Ошибка загрузки метаданных: {e}")
             self.user_files = {}
+            self.metadata_damaged = True
 
-    def save_metadata(self) -> None:
-        """Сохранение метаданных в JSON."""
+    def _load_legacy_json(self, data: str) -> None:
+        """Миграция со старого fs_meta.json (path игнорируется — он вычисляемый)."""
+        # Если файл пустой
+        if not data.strip():
+            return
+        for owner, files in json.loads(data).items():
+            owner_files = self._owner_files(owner)
+            for filename, meta in files.items():
+                owner_files.add(
+                    filename,
+                    meta.get("size", 0),
+                    meta.get("created", 0.0),
+                    meta.get("modified", meta.get("created", 0.0)),
+                    bool(meta.get("readonly", False)),
+                )
+
+    def _load_binary(self, raw: bytes) -> None:
+        """
+        Разбор fs_meta.bin (формат описан у META_MAGIC).
+        Любое несоответствие размеров — ValueError: обрезанный или битый
+        файл нельзя читать частично, иначе следующее сохранение закрепит потерю.
+        """
+        if not raw:
+            return
         try:
-            self.meta_path.write_text(
-                json.dumps(self.user_files, ensure_ascii=False, indent=2),
-                encoding="utf-8",
+            magic, version, n_owners, n_files = _META_HEADER.unpack_from(raw, 0)
+        except struct.error:
+            raise ValueError("Метаданные повреждены: обрезан заголовок") from None
+        if magic != META_MAGIC or version != META_VERSION:
+            raise ValueError("Неизвестный формат метаданных")
+        pos = _META_HEADER.size
+
+        def read_strings(count: int) -> List[str]:
+            nonlocal pos
+            try:
+                (length,) = _META_LEN.unpack_from(raw, pos)
+            except struct.error:
+                raise ValueError("Метаданные повреждены: обрезана таблица строк") from None
+            pos += _META_LEN.size
+            blob = raw[pos:pos + length]
+            if len(blob) != length:
+                raise ValueError("Метаданные повреждены: обрезана таблица строк")
+            pos += length
+            strings = blob.decode("utf-8").split("\0") if count else []
+            if len(strings) != count or (not count and length):
+                raise ValueError("Метаданные повреждены: не совпадает число строк")
+            return strings
+
+        def read_column(typecode: str, count: int) -> array.array:
+            nonlocal pos
+            column = array.array(typecode)
+            end = pos + column.itemsize * count
+            if end > len(raw):
+                raise ValueError("Метаданные повреждены: обрезана колонка")
+            column.frombytes(raw[pos:end])
+            pos = end
+            if sys.byteorder != "little":
+                column.byteswap()
+            return column
+
+        owners = [sys.intern(o) for o in read_strings(n_owners)]
+        counts = read_column("I", n_owners)
+        if sum(counts) != n_files:
+            raise ValueError("Метаданные повреждены: не совпадает число файлов")
+        filenames = read_strings(n_files)
+
+        expected = pos + n_files * _META_ROW_SIZE
+        if len(raw) != expected:
+            raise ValueError(
+                f"Метаданные повреждены: {len(raw)} байт вместо {expected}"
             )
+        sizes = read_column("Q", n_files)
+        created = read_column("d", n_files)
+        modified = read_column("d", n_files)
+        readonly = raw[pos:pos + n_files]
+        if len(readonly) != n_files:
+            raise ValueError("Метаданные повреждены: не совпадает длина колонок")
+
+        # Собираем в отдельный словарь: при ошибке user_files не трогаем
+        user_files: Dict[str, OwnerFiles] = {}
+        start = 0
+        for owner, count in zip(owners, counts):
+            end = start + count
+            names = filenames[start:end]
+            owner_files = OwnerFiles(
+                self.backend, owner, names,
+                sizes[start:end], created[start:end], modified[start:end],
+                bytearray(readonly[start:end]),
+            )
+            if len(owner_files.index) != count:
+                raise ValueError("Метаданные повреждены: повторяются имена файлов")
+            user_files[owner] = owner_files
+            start = end
+        if len(user_files) != n_owners:
+            raise ValueError("Метаданные повреждены: повторяются владельцы")
+        self.user_files = user_files
+
+    def _dump_binary(self) -> bytes:
+        """Сериализация user_files в колоночный бинарный формат."""
+        owners = [files for files in self.user_files.values() if files]
+        counts = array.array("I", [len(files) for files in owners])
+        filenames = [name for files in owners for name in files.names]
+
+        owners_blob = "\0".join(files.owner for files in owners).encode("utf-8")
+        names_blob = "\0".join(filenames).encode("utf-8")
+        parts = [
+            _META_HEADER.pack(META_MAGIC, META_VERSION, len(owners), len(filenames)),
+            _META_LEN.pack(len(owners_blob)), owners_blob,
+            self._column_bytes(counts),
+            _META_LEN.pack(len(names_blob)), names_blob,
+        ]
+        for column in ("sizes", "created", "modified"):
+            parts.extend(self._column_bytes(getattr(files, column)) for files in owners)
+        parts.extend(bytes(files.readonly) for files in owners)
+        return b"".join(parts)
+
+    @staticmethod
+    def _column_bytes(column: array.array) -> bytes:
+        if sys.byteorder != "little":
+            column = array.array(column.typecode, column)
+            column.byteswap()
+        return column.tobytes()
+
+    def _owner_files(self, owner: str) -> OwnerFiles:
+        """Файлы владельца; пустая таблица создаётся при первом обращении."""
+        files = self.user_files.get(owner)
+        if files is None:
+            files = self.user_files[sys.intern(owner)] = OwnerFiles(self.backend, owner)
+        return files
+
+    def save_metadata(self) -> bool:
+        """Сохранение метаданных в бинарный fs_meta.bin. False — не сохранено."""
+        if not self._check_writable():
+            return False
+        try:
+            self.backend.write(self.meta_key, self._dump_binary())
+            if self._legacy_pending:
+                # Иначе при пропаже fs_meta.bin молча вернулись бы старые данные
+                self.backend.delete(self.legacy_meta_key)
+                self._legacy_pending = False
         except Exception as e:
             print(f"❌ Ошибка сохранения метаданных: {e}")
+            return False
+        return True
 
-    def _get_file_record(self, user: str, filename: str) -> Optional[Dict[str, Any]]:
+    def _check_writable(self) -> bool:
+        """
+        Изменения запрещены, если метаданные не загрузились: сохранить их
+        всё равно нельзя, а «успешно» созданный файл пропал бы после перезапуска.
+        """
+        if self.metadata_damaged:
+            print("❌ Метаданные повреждены, изменения отключены (файл оставлен как есть)")
+            return False
+        return True
+
+    def _get_file_record(self, user: str, filename: str) -> Optional[FileRecord]:
         """Получить запись о файле из метаданных."""
+        try:
+            filename = self._normalize_filename(filename)
+        except ValueError:
+            return None
         return self.user_files.get(user, {}).get(filename)
 
-    def _normalize_filename(self, filename: str) -> str:
-        """Простейшая защита: запрет выхода за корень (..)."""
-        # Можно усложнить, пока только простая проверка
-        if ".." in pathlib.PurePosixPath(filename).parts:
+    def _normalize_filename(self, filename: str, allow_root: bool = False) -> str:
+        """
+        Приводит имя к каноническому виду 'docs/test.txt' (через PurePosixPath),
+        чтобы все хранилища видели один и тот же ключ.
+        Запрещены: выход за корень (..), абсолютные и пустые имена, '/' в конце.
+        allow_root=True — для каталогов в browse(): разрешены '.' (корень
+        пользователя) и '/' в конце.
+        """
+        if filename.startswith("/"):
+            raise ValueError("Недопустимый путь (абсолютный)")
+        if filename.endswith("/") and not allow_root:
+            raise ValueError("Недопустимое имя файла ('/' в конце)")
+        path = pathlib.PurePosixPath(filename)
+        if ".." in path.parts:
             raise ValueError("Недопустимый путь (содержит '..')")
-        return filename
+        if not path.parts:
+            if allow_root:
+                return "."
+            raise ValueError("Пустое имя файла")
+        return path.as_posix()
 
     # ============ ПУБЛИЧНЫЕ ОПЕРАЦИИ ============
 
@@ -73,25 +435,17 @@ class ProFileSystem:
         except ValueError as e:
             print(f"❌ {e}")
             return False
-
-        file_path = self.data_dir / owner / filename
-        file_path.parent.mkdir(parents=True, exist_ok=True)
+        if not self._check_writable():
+            return False
 
         try:
-            file_path.write_text(content, encoding="utf-8")
-            stat = file_path.stat()
-            self.user_files.setdefault(owner, {})[filename] = {
-                "path": str(file_path),
-                "size": len(content),
-                "created": stat.st_mtime,
-                "modified": stat.st_mtime,
-                "owner": owner,
-                "readonly": readonly,
-                # В будущем можно добавить список разрешённых читателей:
-                # "allowed_readers": [owner]
-            }
-            self.save_metadata()
-            return True
+            stat = self.backend.write(f"{owner}/{filename}", content.encode("utf-8"))
+            # В будущем можно добавить список разрешённых читателей
+            # (отдельной колонкой OwnerFiles и fs_meta.bin)
+            self._owner_files(owner).add(
+                filename, len(content), stat.modified, stat.modified, readonly,
+            )
+            return self.save_metadata()
         except Exception as e:
             print(f"❌ Ошибка создания файла: {e}")
             return False
@@ -107,12 +461,10 @@ class ProFileSystem:
         if not record:
             return None
 
-        file_path = pathlib.Path(record["path"])
-        if not file_path.exists():
-            return None
-
         try:
-            return file_path.read_text(encoding="utf-8")
+            return self.backend.read(record.key).decode("utf-8")
+        except FileNotFoundError:
+            return None
         except Exception as e:
             print(f"❌ Ошибка чтения файла: {e}")
             return None
@@ -126,21 +478,18 @@ class ProFileSystem:
         if not record:
             return False
 
-        if record.get("readonly"):
+        if record.readonly:
             print("❌ Файл только для чтения")
             return False
 
-        file_path = pathlib.Path(record["path"])
-        if not file_path.exists():
+        if not self.backend.exists(record.key) or not self._check_writable():
             return False
 
         try:
-            file_path.write_text(new_content, encoding="utf-8")
-            stat = file_path.stat()
-            record["size"] = len(new_content)
-            record["modified"] = stat.st_mtime
-            self.save_metadata()
-            return True
+            stat = self.backend.write(record.key, new_content.encode("utf-8"))
+            record.size = len(new_content)
+            record.modified = stat.modified
+            return self.save_metadata()
         except Exception as e:
             print(f"❌ Ошибка обновления файла: {e}")
             return False
@@ -151,23 +500,21 @@ class ProFileSystem:
         path относительно корня пользователя: '.', 'docs', 'docs/subdir'.
         """
         try:
-            path = self._normalize_filename(path)
+            path = self._normalize_filename(path, allow_root=True)
         except ValueError as e:
             print(f"❌ {e}")
             return []
 
-        base_path = self.data_dir / user / path
-        if not base_path.exists():
-            return []
+        prefix = pathlib.PurePosixPath(user, path).as_posix()
 
         items: List[Dict[str, Any]] = []
         try:
-            for item in base_path.iterdir():
+            for entry in self.backend.list(prefix):
                 items.append({
-                    "name": item.name,
-                    "is_dir": item.is_dir(),
-                    "size": item.stat().st_size if item.is_file() else 0,
-                    "modified": item.stat().st_mtime,
+                    "name": entry.name,
+                    "is_dir": entry.is_dir,
+                    "size": entry.size,
+                    "modified": entry.modified,
                 })
         except Exception as e:
             print(f"❌ Ошибка при обзоре каталога: {e}")
@@ -184,32 +531,43 @@ class ProFileSystem:
         if not record:
             return False
 
-        if record.get("readonly"):
+        if record.readonly:
             print("❌ Нельзя удалить файл только для чтения")
             return False
+        if not self._check_writable():
+            return False
 
-        file_path = pathlib.Path(record["path"])
         try:
-            if file_path.exists():
-                file_path.unlink()
+            self.backend.delete(record.key)
 
             # Удаляем запись из метаданных
-            del self.user_files[user][filename]
+            del self.user_files[user][record.filename]
             if not self.user_files[user]:
                 # Если у пользователя больше нет файлов — убираем ключ
                 del self.user_files[user]
 
-            self.save_metadata()
-            return True
+            return self.save_metadata()
         except Exception as e:
             print(f"❌ Ошибка удаления файла: {e}")
             return False
 
+    def delete_user(self, user: str) -> bool:
+        """Удаление всех файлов пользователя (для админ-панели)."""
+        if not self._check_writable():
+            return False
+        try:
+            self.backend.remove_tree(user)
+            self.user_files.pop(user, None)
+            return self.save_metadata()
+        except Exception as e:
+            print(f"❌ Ошибка удаления файлов пользователя: {e}")
+            return False
+
     # ===== Дополнительно: проверка существования =====
 
     def exists(self, filename: str, user: str) -> bool:
-        """Проверка, что файл есть и в метаданных, и на диске."""
+        """Проверка, что файл есть и в метаданных, и в хранилище."""
         record = self._get_file_record(user, filename)
         if not record:
             return False
-        return pathlib.Path(record["path"]).exists()
+        return self.backend.exists(record.key)
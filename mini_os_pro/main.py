@@ -1,11 +1,13 @@
 import sys
 import json
 import pathlib
-import shutil
+from typing import Optional
 from PyQt6 import QtWidgets, QtCore, QtGui
 from PyQt6.QtWidgets import QAbstractItemView
 
 from filesystem import ProFileSystem
+from prefetch import PreviewPrefetcher
+from storage import MemoryBackend
 
 
 # База пользователей (data/users.json)
@@ -217,10 +219,10 @@ class AdminPanel(QtWidgets.QMainWindow):
         layout.addWidget(btn_ok)
 
         if dialog.exec() == QtWidgets.QDialog.DialogCode.Accepted:
+            global USERS_DB
             login = login_edit.text().strip()
             password = pass_edit.text().strip()
             if login and password and login not in USERS_DB:
-                global USERS_DB
                 USERS_DB[login] = password
                 save_users(USERS_DB)
                 self.refresh_users()
@@ -247,26 +249,24 @@ class AdminPanel(QtWidgets.QMainWindow):
             del USERS_DB[username]
             save_users(USERS_DB)
             
-            # Удаляем папку пользователя
-            user_path = self.fs.data_dir / username
-            if user_path.exists():
-                shutil.rmtree(user_path)
-            
-            # Удаляем из метаданных
-            if username in self.fs.user_files:
-                del self.fs.user_files[username]
-            self.fs.save_metadata()
+            # Удаляем файлы пользователя и записи о них из метаданных
+            files_removed = self.fs.delete_user(username)
             
             self.refresh_users()
             self.admin_file_list.clear()
             self.user_info.setText("Пользователь удалён")
-            QtWidgets.QMessageBox.information(self, "✅ Успех", f"Пользователь '{username}' удалён!")
+            if files_removed:
+                QtWidgets.QMessageBox.information(self, "✅ Успех", f"Пользователь '{username}' удалён!")
+            else:
+                QtWidgets.QMessageBox.warning(self, "❌ Ошибка",
+                                              f"Пользователь '{username}' удалён, но его файлы удалить не удалось!")
 
 
 class FileSystemWindow(QtWidgets.QMainWindow):
-    def __init__(self, username: str):
+    def __init__(self, username: str, fs: Optional[ProFileSystem] = None):
         super().__init__()
-        self.fs = ProFileSystem()
+        self.fs = fs if fs is not None else ProFileSystem()
+        self.prefetcher = PreviewPrefetcher(self.fs)
         self.current_user = username
         self.current_path = "."
         self.setWindowTitle(f"ProOS – файловый менеджер ({username})")
@@ -312,6 +312,8 @@ class FileSystemWindow(QtWidgets.QMainWindow):
         self.path_label.setStyleSheet("font-weight: bold; padding: 5px;")
         self.file_list = QtWidgets.QListWidget()
         self.file_list.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        # Для itemEntered (подсказки предзагрузчику при наведении)
+        self.file_list.setMouseTracking(True)
         left_layout.addWidget(self.path_label)
         left_layout.addWidget(self.file_list, 1)
         splitter.addWidget(left_panel)
@@ -330,6 +332,8 @@ class FileSystemWindow(QtWidgets.QMainWindow):
 
         # Сигналы
         self.file_list.itemClicked.connect(self.on_file_selected)
+        self.file_list.itemEntered.connect(self.on_file_hovered)
+        self.file_list.currentItemChanged.connect(self.on_file_hovered)
         self.btn_create.clicked.connect(self.on_create_clicked)
         self.btn_edit.clicked.connect(self.on_edit_clicked)
         self.btn_delete.clicked.connect(self.on_delete_clicked)
@@ -376,6 +380,9 @@ class FileSystemWindow(QtWidgets.QMainWindow):
         self.path_label.setText(f"📁 Путь: {self.current_path}")
         self.load_files()
 
+    def _full_name(self, name: str) -> str:
+        return name if self.current_path == "." else f"{self.current_path}/{name}"
+
     def load_files(self):
         self.file_list.clear()
         items = self.fs.browse(self.current_user, self.current_path)
@@ -385,6 +392,18 @@ class FileSystemWindow(QtWidgets.QMainWindow):
             item.setData(QtCore.Qt.ItemDataRole.UserRole, it)
             self.file_list.addItem(item)
 
+        # Заранее читаем превью файлов каталога (прошлый каталог отменяется)
+        self.prefetcher.start(self.current_user, [
+            self._full_name(it["name"]) for it in items if not it["is_dir"]
+        ])
+
+    def on_file_hovered(self, item, _previous=None):
+        if item is None:
+            return
+        info = item.data(QtCore.Qt.ItemDataRole.UserRole)
+        if not info["is_dir"]:
+            self.prefetcher.hint(self.current_user, self._full_name(info["name"]))
+
     def on_file_selected(self, item):
         info = item.data(QtCore.Qt.ItemDataRole.UserRole)
         if info["is_dir"]:
@@ -394,8 +413,8 @@ class FileSystemWindow(QtWidgets.QMainWindow):
             self.text_edit.clear()
             return
 
-        filename = info["name"] if self.current_path == "." else f"{self.current_path}/{info['name']}"
-        data = self.fs.read(filename, self.current_user)
+        filename = self._full_name(info["name"])
+        data = self.prefetcher.read(filename, self.current_user)
         if data is None:
             self.text_edit.setPlainText("❌ Нет доступа к файлу")
         else:
@@ -434,6 +453,7 @@ class FileSystemWindow(QtWidgets.QMainWindow):
 
         text, ok = QtWidgets.QInputDialog.getMultiLineText(self, "✏️ Редактировать", f"Файл: {filename}", old_data)
         if ok and self.fs.update(filename, text, self.current_user):
+            self.prefetcher.invalidate(self.current_user, filename)
             self.text_edit.setPlainText(text)
             self.animate_content()
         else:
@@ -454,11 +474,16 @@ class FileSystemWindow(QtWidgets.QMainWindow):
         res = QtWidgets.QMessageBox.question(self, "⚠️ Удалить?", f"Удалить файл '{filename}'?")
         if res == QtWidgets.QMessageBox.StandardButton.Yes:
             if self.fs.delete(filename, self.current_user):
+                self.prefetcher.invalidate(self.current_user, filename)
                 self.load_files()
                 self.text_edit.clear()
             else:
                 QtWidgets.QMessageBox.warning(self, "❌ Ошибка", "Не удалось удалить файл!")
 
+    def closeEvent(self, event):
+        self.prefetcher.stop()
+        super().closeEvent(event)
+
 
 def main():
     global USERS_DB
@@ -474,7 +499,8 @@ def main():
         login, password = login_dialog.get_credentials()
 
         if login == "guest":
-            win = FileSystemWindow("guest")
+            # Гостевая сессия живёт только в памяти и ничего не пишет на диск
+            win = FileSystemWindow("guest", ProFileSystem(backend=MemoryBackend()))
             win.show()
             sys.exit(app.exec())
         elif login in USERS_DB and USERS_DB[login] == password:
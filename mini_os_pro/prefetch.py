@@ -0,0 +1,215 @@
+import heapq
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from filesystem import FileRecord, ProFileSystem
+
+# Версия содержимого файла: (modified, size) из метаданных
+Version = Tuple[float, int]
+
+
+class PreviewPrefetcher:
+    """
+    Фоновая подгрузка превью файлов для FileSystemWindow.
+    - start() вызывается при показе каталога: в очередь встают его файлы,
+      сначала мелкие; всё, что не влезает в max_cache_size, не читается.
+      Остаток очереди от прошлого каталога при этом отменяется
+    - hint() поднимает файл в начало очереди (наведение мышью, выбор стрелками)
+    - read() отдаёт текст из кэша или читает через fs.read() и кладёт в кэш;
+      если этот файл как раз читает фоновый поток — дожидается его
+    - invalidate() вызывается после изменения/удаления файла из приложения
+    Кэш — LRU. Все размеры (бюджет, лимиты, заполненность кэша) считаются
+    в единицах FileRecord.size, т.е. в символах текста. Запись считается
+    устаревшей, если у файла в метаданных изменились modified или size:
+    одного modified мало на ФС с грубым временем (FAT, HFS+, сетевые диски).
+    """
+
+    HINT_PRIORITY = 0
+    LISTING_PRIORITY = 1
+
+    def __init__(self, fs: ProFileSystem, max_cache_size: int = 4 * 1024 * 1024,
+                 max_file_size: int = 256 * 1024):
+        self.fs = fs
+        self.max_cache_size = max_cache_size
+        self.max_file_size = max_file_size
+
+        # cache[(user, filename)] = (content, (modified, size))
+        self.cache: "OrderedDict[Tuple[str, str], Tuple[str, Version]]" = OrderedDict()
+        self.cached_size = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._cond = threading.Condition()
+        # Элементы: (priority, size, seq, generation, user, filename)
+        self._queue: list = []
+        self._seq = itertools.count()
+        self._generation = 0
+        self._budget = 0
+        # Файлы, которые фоновый поток читает прямо сейчас
+        self._inflight: Dict[Tuple[str, str], threading.Event] = {}
+        # Из них изменённые во время чтения — результат чтения выбрасывается
+        self._invalidated: Set[Tuple[str, str]] = set()
+        self._stopped = False
+        self._worker = threading.Thread(target=self._run, name="preview-prefetch", daemon=True)
+        self._worker.start()
+
+    # ============ УПРАВЛЕНИЕ ОЧЕРЕДЬЮ ============
+
+    def start(self, user: str, filenames: Iterable[str]) -> None:
+        """Начать подгрузку каталога вместо предыдущего."""
+        with self._cond:
+            self._reset()
+            for filename in filenames:
+                record = self.fs.user_files.get(user, {}).get(filename)
+                if record is not None and record.size <= self.max_file_size:
+                    self._push(self.LISTING_PRIORITY, record.size, user, filename)
+            self._cond.notify()
+
+    def hint(self, user: str, filename: str) -> None:
+        """Пользователь, скорее всего, скоро откроет этот файл."""
+        record = self.fs.user_files.get(user, {}).get(filename)
+        if record is None or record.size > self.max_file_size:
+            return
+        with self._cond:
+            self._push(self.HINT_PRIORITY, record.size, user, filename)
+            self._cond.notify()
+
+    def invalidate(self, user: str, filename: str) -> None:
+        """Файл изменён или удалён приложением — забыть его текст."""
+        key = (user, filename)
+        with self._cond:
+            old = self.cache.pop(key, None)
+            if old is not None:
+                self.cached_size -= len(old[0])
+            if key in self._inflight:
+                self._invalidated.add(key)
+
+    def pending(self) -> int:
+        """Сколько файлов ещё в очереди или читается прямо сейчас."""
+        with self._cond:
+            return len(self._queue) + len(self._inflight)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Дождаться, пока фоновый поток разберёт очередь. False — по таймауту."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue and not self._inflight, timeout)
+
+    def stop(self) -> None:
+        """Остановить фоновый поток (при закрытии окна)."""
+        with self._cond:
+            self._reset()
+            self._stopped = True
+            self._cond.notify()
+        self._worker.join(timeout=1.0)
+
+    def _reset(self) -> None:
+        self._generation += 1
+        self._queue.clear()
+        self._budget = self.max_cache_size
+
+    def _push(self, priority: int, size: int, user: str, filename: str) -> None:
+        heapq.heappush(
+            self._queue, (priority, size, next(self._seq), self._generation, user, filename)
+        )
+
+    # ============ КЭШ ============
+
+    def read(self, filename: str, user: str) -> Optional[str]:
+        """То же, что fs.read(), но через кэш."""
+        key = (user, filename)
+        with self._cond:
+            record = self.fs.user_files.get(user, {}).get(filename)
+            if record is None:
+                self.misses += 1
+                return None
+            version = self._version(record)
+            content = self._cached(key, version)
+            inflight = self._inflight.get(key) if content is None else None
+        if inflight is not None:
+            # Фоновый поток уже читает этот файл — второе чтение только замедлит
+            inflight.wait()
+            with self._cond:
+                content = self._cached(key, version)
+        if content is not None:
+            with self._cond:
+                self.hits += 1
+            return content
+
+        content = self.fs.read(filename, user)
+        with self._cond:
+            self.misses += 1
+            if content is not None:
+                self._store(key, content, version)
+        return content
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @staticmethod
+    def _version(record: FileRecord) -> Version:
+        return record.modified, record.size
+
+    def _cached(self, key: Tuple[str, str], version: Version) -> Optional[str]:
+        cached = self.cache.get(key)
+        if cached is None or cached[1] != version:
+            return None
+        self.cache.move_to_end(key)
+        return cached[0]
+
+    def _store(self, key: Tuple[str, str], content: str, version: Version) -> None:
+        if len(content) > self.max_cache_size:
+            # Такой файл вытеснил бы весь кэш и всё равно не поместился бы
+            return
+        old = self.cache.pop(key, None)
+        if old is not None:
+            self.cached_size -= len(old[0])
+        self.cache[key] = (content, version)
+        self.cached_size += len(content)
+        while self.cached_size > self.max_cache_size:
+            _, (evicted, _) = self.cache.popitem(last=False)
+            self.cached_size -= len(evicted)
+
+    # ============ ФОНОВЫЙ ПОТОК ============
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                priority, _, _, generation, user, filename = heapq.heappop(self._queue)
+                # Очередь могла опустеть — будим wait_idle()
+                self._cond.notify_all()
+                if generation != self._generation:
+                    continue
+                key = (user, filename)
+                record = self.fs.user_files.get(user, {}).get(filename)
+                if record is None or key in self._inflight:
+                    continue
+                version = self._version(record)
+                if self._cached(key, version) is not None:
+                    continue
+                if priority != self.HINT_PRIORITY:
+                    # Подсказки пользователя читаются всегда, остальное — в пределах бюджета
+                    if record.size > self._budget:
+                        continue
+                    self._budget -= record.size
+                done = self._inflight[key] = threading.Event()
+
+            # Чтение — вне блокировки, чтобы не тормозить GUI-поток
+            try:
+                content = self.fs.read(filename, user)
+                with self._cond:
+                    if content is not None and key not in self._invalidated:
+                        self._store(key, content, version)
+            finally:
+                with self._cond:
+                    del self._inflight[key]
+                    self._invalidated.discard(key)
+                    self._cond.notify_all()
+                done.set()
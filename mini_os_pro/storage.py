@@ -0,0 +1,311 @@
+import abc
+import pathlib
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+
+class BlobStat(NamedTuple):
+    size: int
+    modified: float
+
+
+class BlobEntry(NamedTuple):
+    name: str
+    is_dir: bool
+    size: int
+    modified: float
+
+
+class StorageBackend(abc.ABC):
+    """
+    Хранилище "блобов" для ProFileSystem.
+    Ключ — относительный posix-путь: 'user1/docs/test.txt'.
+    Отсутствующий ключ -> FileNotFoundError (как у pathlib).
+    """
+
+    @abc.abstractmethod
+    def read(self, key: str) -> bytes:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def write(self, key: str, data: bytes) -> BlobStat:
+        """Записать блоб (родительские "каталоги" создаются сами)."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def stat(self, key: str) -> BlobStat:
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.stat(key)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def path_for(self, key: str) -> Optional[str]:
+        """Путь к блобу на локальном диске; None, если хранилище не на диске."""
+        return None
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def list(self, prefix: str) -> List[BlobEntry]:
+        """Содержимое "каталога" prefix; пустой список, если его нет."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def remove_tree(self, prefix: str) -> None:
+        """Удалить "каталог" prefix со всем содержимым."""
+        raise NotImplementedError
+
+
+def _split_child(key: str, prefix: str):
+    """
+    Для плоских хранилищ: если key лежит внутри prefix, вернуть
+    (имя непосредственного потомка, является ли он каталогом), иначе None.
+    """
+    if prefix:
+        if not key.startswith(prefix + "/"):
+            return None
+        key = key[len(prefix) + 1:]
+    name, sep, _ = key.partition("/")
+    return name, bool(sep)
+
+
+def _collect_entries(rows, prefix: str) -> List[BlobEntry]:
+    """Свернуть плоский список (key, size, modified) в записи каталога."""
+    files: Dict[str, BlobEntry] = {}
+    dirs: Dict[str, float] = {}
+    for key, size, modified in rows:
+        child = _split_child(key, prefix)
+        if child is None:
+            continue
+        name, is_dir = child
+        if is_dir:
+            dirs[name] = max(dirs.get(name, 0.0), modified)
+        else:
+            files[name] = BlobEntry(name, False, size, modified)
+    entries = [BlobEntry(name, True, 0, modified) for name, modified in dirs.items()]
+    entries.extend(files.values())
+    return entries
+
+
+class LocalDirBackend(StorageBackend):
+    """Обычные файлы в каталоге root (поведение ProFileSystem по умолчанию)."""
+
+    def __init__(self, root: str = "data"):
+        self.root = pathlib.Path(root)
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.root / key
+
+    def path_for(self, key: str) -> Optional[str]:
+        return str(self._path(key))
+
+    def read(self, key: str) -> bytes:
+        return self._path(key).read_bytes()
+
+    def write(self, key: str, data: bytes) -> BlobStat:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        return self.stat(key)
+
+    def stat(self, key: str) -> BlobStat:
+        st = self._path(key).stat()
+        return BlobStat(st.st_size, st.st_mtime)
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def delete(self, key: str) -> None:
+        path = self._path(key)
+        if path.exists():
+            path.unlink()
+
+    def list(self, prefix: str) -> List[BlobEntry]:
+        base = self._path(prefix)
+        if not base.exists():
+            return []
+        entries: List[BlobEntry] = []
+        for item in base.iterdir():
+            st = item.stat()
+            is_dir = item.is_dir()
+            entries.append(BlobEntry(item.name, is_dir, 0 if is_dir else st.st_size, st.st_mtime))
+        return entries
+
+    def remove_tree(self, prefix: str) -> None:
+        path = self._path(prefix)
+        if path.exists():
+            shutil.rmtree(path)
+
+
+class MemoryBackend(StorageBackend):
+    """
+    Всё в оперативной памяти, на диск не пишется ничего.
+    Для тестов и гостевых сессий: после выхода данные пропадают.
+    Рядом с блобами хранится индекс каталогов, чтобы list() не перебирал
+    все ключи: как и у плоских хранилищ, пустые каталоги исчезают сами.
+    """
+
+    def __init__(self):
+        # blobs[key] = (data, modified)
+        self.blobs: Dict[str, Tuple[bytes, float]] = {}
+        # dirs[каталог] = {имя потомка, ...}; корень — ''
+        self.dirs: Dict[str, Set[str]] = {}
+        # dir_modified[каталог] = время последнего добавления/удаления потомка
+        self.dir_modified: Dict[str, float] = {}
+
+    @staticmethod
+    def _join(prefix: str, name: str) -> str:
+        return f"{prefix}/{name}" if prefix else name
+
+    def _link(self, key: str, modified: float) -> None:
+        """Прописать key и все его родительские каталоги в индексе."""
+        parent, _, name = key.rpartition("/")
+        while True:
+            children = self.dirs.setdefault(parent, set())
+            self.dir_modified[parent] = modified
+            if name in children:
+                return
+            children.add(name)
+            if not parent:
+                return
+            parent, _, name = parent.rpartition("/")
+
+    def _unlink(self, key: str) -> None:
+        """Убрать key из индекса вместе с опустевшими каталогами."""
+        modified = time.time()
+        parent, _, name = key.rpartition("/")
+        while True:
+            children = self.dirs.get(parent)
+            if children is None:
+                return
+            children.discard(name)
+            self.dir_modified[parent] = modified
+            if children or not parent:
+                return
+            del self.dirs[parent]
+            del self.dir_modified[parent]
+            parent, _, name = parent.rpartition("/")
+
+    def read(self, key: str) -> bytes:
+        try:
+            return self.blobs[key][0]
+        except KeyError:
+            raise FileNotFoundError(key) from None
+
+    def write(self, key: str, data: bytes) -> BlobStat:
+        modified = time.time()
+        if key not in self.blobs:
+            self._link(key, modified)
+        self.blobs[key] = (bytes(data), modified)
+        return BlobStat(len(data), modified)
+
+    def stat(self, key: str) -> BlobStat:
+        try:
+            data, modified = self.blobs[key]
+        except KeyError:
+            raise FileNotFoundError(key) from None
+        return BlobStat(len(data), modified)
+
+    def exists(self, key: str) -> bool:
+        return key in self.blobs
+
+    def delete(self, key: str) -> None:
+        if self.blobs.pop(key, None) is not None:
+            self._unlink(key)
+
+    def list(self, prefix: str) -> List[BlobEntry]:
+        entries: List[BlobEntry] = []
+        for name in list(self.dirs.get(prefix, ())):
+            child = self._join(prefix, name)
+            if child in self.dirs:
+                entries.append(BlobEntry(name, True, 0, self.dir_modified[child]))
+            elif child in self.blobs:
+                data, modified = self.blobs[child]
+                entries.append(BlobEntry(name, False, len(data), modified))
+        return entries
+
+    def remove_tree(self, prefix: str) -> None:
+        stack = [prefix]
+        while stack:
+            current = stack.pop()
+            for name in list(self.dirs.get(current, ())):
+                child = self._join(current, name)
+                if child in self.dirs:
+                    stack.append(child)
+                else:
+                    self.delete(child)
+
+
+class SQLiteBackend(StorageBackend):
+    """Все блобы в одном файле SQLite (одна таблица key -> data)."""
+
+    def __init__(self, db_path: str = "data.sqlite"):
+        self.db_path = db_path
+        # Соединение общее для всех потоков, доступ — под self._lock
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                " key TEXT PRIMARY KEY, data BLOB NOT NULL, modified REAL NOT NULL)"
+            )
+
+    def _query(self, sql: str, args: tuple = ()) -> list:
+        with self._lock, self._conn:
+            return self._conn.execute(sql, args).fetchall()
+
+    def read(self, key: str) -> bytes:
+        rows = self._query("SELECT data FROM blobs WHERE key = ?", (key,))
+        if not rows:
+            raise FileNotFoundError(key)
+        return rows[0][0]
+
+    def write(self, key: str, data: bytes) -> BlobStat:
+        modified = time.time()
+        self._query(
+            "INSERT OR REPLACE INTO blobs (key, data, modified) VALUES (?, ?, ?)",
+            (key, sqlite3.Binary(data), modified),
+        )
+        return BlobStat(len(data), modified)
+
+    def stat(self, key: str) -> BlobStat:
+        rows = self._query("SELECT length(data), modified FROM blobs WHERE key = ?", (key,))
+        if not rows:
+            raise FileNotFoundError(key)
+        return BlobStat(*rows[0])
+
+    def delete(self, key: str) -> None:
+        self._query("DELETE FROM blobs WHERE key = ?", (key,))
+
+    def list(self, prefix: str) -> List[BlobEntry]:
+        if prefix:
+            rows = self._query(
+                "SELECT key, length(data), modified FROM blobs WHERE key >= ? AND key < ?",
+                self._subtree_range(prefix),
+            )
+        else:
+            rows = self._query("SELECT key, length(data), modified FROM blobs")
+        return _collect_entries(rows, prefix)
+
+    def remove_tree(self, prefix: str) -> None:
+        self._query("DELETE FROM blobs WHERE key >= ? AND key < ?", self._subtree_range(prefix))
+
+    @staticmethod
+    def _subtree_range(prefix: str) -> Tuple[str, str]:
+        # Все ключи вида 'prefix/...' лежат в [prefix + '/', prefix + '0'):
+        # '0' — следующий за '/' символ. Диапазон, в отличие от LIKE/substr,
+        # идёт по индексу первичного ключа, а '%' и '_' в именах не мешают.
+        return prefix + "/", prefix + "0"
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,5 @@
+import pathlib
+import sys
+
+# Модули ProOS импортируются по-плоскому (как в main.py): from filesystem import ...
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "mini_os_pro"))
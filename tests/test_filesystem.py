@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from filesystem import OwnerFiles, ProFileSystem
+from storage import MemoryBackend
+
+
+@pytest.fixture
+def backend():
+    return MemoryBackend()
+
+
+def _snapshot(fs):
+    return {owner: {name: dict(rec) for name, rec in files.items()}
+            for owner, files in fs.user_files.items()}
+
+
+def test_binary_metadata_round_trip(backend):
+    fs = ProFileSystem(backend=backend)
+    fs.create("a.txt", "привет", "user1")
+    fs.create("docs/b.txt", "x" * 100, "user1", readonly=True)
+    fs.create("c.txt", "", "user2")
+
+    loaded = ProFileSystem(backend=backend)
+
+    assert _snapshot(loaded) == _snapshot(fs)
+    assert loaded.user_files["user1"]["docs/b.txt"]["readonly"] is True
+    assert loaded.read("a.txt", "user1") == "привет"
+
+
+@pytest.mark.parametrize("cut", [1, 7, 40])
+def test_truncated_metadata_is_rejected_and_kept(backend, cut):
+    fs = ProFileSystem(backend=backend)
+    for i in range(10):
+        fs.create(f"f{i}.txt", "x" * i, "user1" if i % 2 else "user2")
+    damaged = backend.read("fs_meta.bin")[:-cut]
+    backend.write("fs_meta.bin", damaged)
+
+    loaded = ProFileSystem(backend=backend)
+    assert loaded.metadata_damaged
+    assert loaded.user_files == {}
+
+    loaded.save_metadata()
+    assert backend.read("fs_meta.bin") == damaged
+
+
+def test_legacy_json_is_migrated_and_removed(backend):
+    legacy = {"user1": {"Ar": {"path": "data\\user1\\Ar", "size": 1, "created": 1.5,
+                               "modified": 2.5, "owner": "user1", "readonly": False}}}
+    backend.write("fs_meta.json", json.dumps(legacy).encode("utf-8"))
+
+    fs = ProFileSystem(backend=backend)
+    assert fs.user_files["user1"]["Ar"]["modified"] == 2.5
+    assert backend.exists("fs_meta.json")
+
+    fs.save_metadata()
+    assert not backend.exists("fs_meta.json")
+    assert ProFileSystem(backend=backend).user_files["user1"]["Ar"]["size"] == 1
+
+
+def test_damaged_metadata_blocks_changes(backend):
+    fs = ProFileSystem(backend=backend)
+    fs.create("a.txt", "a", "user1")
+    backend.write("fs_meta.bin", backend.read("fs_meta.bin")[:-3])
+
+    damaged = ProFileSystem(backend=backend)
+    assert not damaged.create("b.txt", "b", "user1")
+    assert not backend.exists("user1/b.txt")
+    assert not damaged.delete_user("user1")
+    assert backend.exists("user1/a.txt")
+
+
+def test_failed_metadata_save_is_reported(backend, monkeypatch):
+    fs = ProFileSystem(backend=backend)
+    fs.create("a.txt", "a", "user1")
+    monkeypatch.setattr(fs, "_dump_binary", lambda: 1 / 0)
+
+    assert not fs.save_metadata()
+    assert not fs.create("b.txt", "b", "user1")
+    assert not fs.update("a.txt", "new", "user1")
+    assert not fs.delete("a.txt", "user1")
+
+
+def test_owner_files_columns_and_views(backend):
+    files = OwnerFiles(backend, "user1")
+    for i in range(4):
+        files.add(f"f{i}.txt", i * 10, float(i), float(i) + 0.5, readonly=(i == 2))
+    view = files["f3.txt"]
+
+    del files["f1.txt"]  # последняя строка переезжает на место удалённой
+
+    assert sorted(files) == ["f0.txt", "f2.txt", "f3.txt"]
+    assert "f1.txt" not in files and len(files) == 3
+    assert dict(view) == {"path": None, "size": 30, "created": 3.0, "modified": 3.5,
+                          "owner": "user1", "readonly": False}
+    view.modified = 9.0
+    assert files["f3.txt"]["modified"] == 9.0
+    assert files["f2.txt"].readonly is True
+    with pytest.raises(KeyError):
+        files["f1.txt"]
@@ -0,0 +1,145 @@
+import threading
+import time
+
+import pytest
+
+from filesystem import ProFileSystem
+from prefetch import PreviewPrefetcher
+from storage import MemoryBackend
+
+
+class CountingBackend(MemoryBackend):
+    """MemoryBackend, который считает чтения и умеет их придерживать."""
+
+    def __init__(self):
+        super().__init__()
+        self.reads = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def read(self, key):
+        if not key.startswith("fs_meta"):
+            self.reads.append(key)
+            self.gate.wait(timeout=5)
+        return super().read(key)
+
+
+@pytest.fixture
+def fs():
+    fs = ProFileSystem(backend=CountingBackend())
+    for name, size in (("a.txt", 100), ("b.txt", 120), ("c.txt", 150), ("big.txt", 1000)):
+        fs.create(name, "x" * size, "user1")
+    fs.backend.reads.clear()
+    return fs
+
+
+@pytest.fixture
+def make_prefetcher(fs):
+    created = []
+
+    def make(**kwargs):
+        p = PreviewPrefetcher(fs, **kwargs)
+        created.append(p)
+        return p
+
+    yield make
+    for p in created:
+        p.stop()
+
+
+def _wait_for_read(fs, count):
+    """Дождаться, пока фоновый поток начнёт count-е чтение."""
+    deadline = time.time() + 5
+    while len(fs.backend.reads) < count:
+        assert time.time() < deadline, "prefetcher did not start reading"
+        time.sleep(0.005)
+
+
+def test_listing_respects_budget_smallest_first(fs, make_prefetcher):
+    p = make_prefetcher(max_cache_size=250, max_file_size=500)
+    p.start("user1", ["big.txt", "ghost.txt", "c.txt", "b.txt", "a.txt"])
+    assert p.wait_idle(timeout=5)
+
+    assert sorted(name for _, name in p.cache) == ["a.txt", "b.txt"]
+    assert p.cached_size == 220
+    assert "user1/big.txt" not in fs.backend.reads
+
+
+def test_miss_is_cached_and_counted(fs, make_prefetcher):
+    p = make_prefetcher(max_cache_size=250, max_file_size=50)
+    assert p.read("a.txt", "user1") == "x" * 100
+    assert p.read("a.txt", "user1") == "x" * 100
+
+    assert fs.backend.reads == ["user1/a.txt"]
+    assert (p.hits, p.misses) == (1, 1)
+    assert p.hit_ratio == 0.5
+
+
+def test_edited_file_is_not_served_stale(fs, make_prefetcher):
+    p = make_prefetcher()
+    p.read("a.txt", "user1")
+    fs.user_files["user1"]["a.txt"].modified += 1  # как после fs.update()
+    fs.backend.write("user1/a.txt", b"new")
+
+    assert p.read("a.txt", "user1") == "new"
+    assert p.read("a.txt", "user1") == "new"
+    assert (p.hits, p.misses) == (1, 2)
+
+
+def test_edit_within_same_mtime_tick(fs, make_prefetcher, monkeypatch):
+    import storage
+    monkeypatch.setattr(storage.time, "time", lambda: 1000.0)  # грубые mtime
+    fs.create("t.txt", "old", "user1")
+    p = make_prefetcher()
+    assert p.read("t.txt", "user1") == "old"
+
+    # Другой размер — запись устарела даже без invalidate()
+    assert fs.update("t.txt", "NEW CONTENT", "user1")
+    assert p.read("t.txt", "user1") == "NEW CONTENT"
+
+    # Тот же размер и тот же mtime — спасает только invalidate()
+    assert fs.update("t.txt", "NEW_CONTENT", "user1")
+    p.invalidate("user1", "t.txt")
+    assert p.read("t.txt", "user1") == "NEW_CONTENT"
+
+
+def test_read_waits_for_inflight_prefetch(fs, make_prefetcher):
+    p = make_prefetcher()
+    fs.backend.gate.clear()
+    p.hint("user1", "a.txt")
+    _wait_for_read(fs, 1)
+
+    threading.Timer(0.05, fs.backend.gate.set).start()
+    assert p.read("a.txt", "user1") == "x" * 100
+
+    assert fs.backend.reads == ["user1/a.txt"]
+    assert (p.hits, p.misses) == (1, 0)
+
+
+def test_new_listing_cancels_queued_reads(fs, make_prefetcher):
+    fs.create("other/x.txt", "x", "user1")
+    fs.backend.reads.clear()
+    p = make_prefetcher()
+    fs.backend.gate.clear()
+    p.start("user1", ["a.txt", "b.txt", "c.txt"])
+    _wait_for_read(fs, 1)  # a.txt читается, b.txt и c.txt ждут в очереди
+
+    p.start("user1", ["other/x.txt"])  # пользователь ушёл в другой каталог
+    fs.backend.gate.set()
+    assert p.wait_idle(timeout=5)
+
+    assert fs.backend.reads == ["user1/a.txt", "user1/other/x.txt"]
+    assert p.pending() == 0
+
+
+def test_hint_is_read_before_listing(fs, make_prefetcher):
+    p = make_prefetcher()
+    fs.backend.gate.clear()
+    p.start("user1", ["a.txt", "b.txt", "c.txt"])
+    _wait_for_read(fs, 1)
+
+    p.hint("user1", "c.txt")  # курсор на самом большом файле каталога
+    fs.backend.gate.set()
+    assert p.wait_idle(timeout=5)
+
+    assert fs.backend.reads == ["user1/a.txt", "user1/c.txt", "user1/b.txt"]
@@ -0,0 +1,104 @@
+import pytest
+
+from filesystem import ProFileSystem
+from storage import LocalDirBackend, MemoryBackend, SQLiteBackend
+
+
+@pytest.fixture(params=["local", "memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "local":
+        return LocalDirBackend(str(tmp_path / "data"))
+    if request.param == "memory":
+        return MemoryBackend()
+    backend = SQLiteBackend(":memory:")
+    request.addfinalizer(backend.close)
+    return backend
+
+
+def _names(items):
+    return sorted((it["name"], it["is_dir"]) for it in items)
+
+
+def test_file_lifecycle(backend, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fs = ProFileSystem(backend=backend)
+    assert fs.create("a.txt", "привет", "user1")
+    assert fs.create("docs/b.txt", "b", "user1")
+    assert fs.create("docs/sub/c.txt", "c", "user1")
+    assert fs.create("ro.txt", "keep", "user1", readonly=True)
+    assert fs.create("x.txt", "x", "user2")
+
+    assert fs.read("a.txt", "user1") == "привет"
+    assert fs.read("a.txt", "user2") is None
+
+    assert fs.update("docs/b.txt", "bbb", "user1")
+    assert fs.read("docs/b.txt", "user1") == "bbb"
+    assert fs.user_files["user1"]["docs/b.txt"]["size"] == 3
+    assert not fs.update("ro.txt", "changed", "user1")
+
+    assert _names(fs.browse("user1")) == [
+        ("a.txt", False), ("docs", True), ("ro.txt", False)]
+    assert _names(fs.browse("user1", "docs")) == [("b.txt", False), ("sub", True)]
+    assert fs.browse("nobody") == []
+    assert fs.browse("user1", "../user2") == []
+
+    assert fs.delete("a.txt", "user1")
+    assert not fs.exists("a.txt", "user1")
+    assert not fs.delete("ro.txt", "user1")
+
+    # Метаданные переживают перезапуск
+    reloaded = ProFileSystem(backend=backend)
+    assert sorted(reloaded.user_files["user1"]) == ["docs/b.txt", "docs/sub/c.txt", "ro.txt"]
+    assert reloaded.read("docs/sub/c.txt", "user1") == "c"
+
+    assert reloaded.delete_user("user1")
+    assert reloaded.browse("user1") == []
+    assert "user1" not in ProFileSystem(backend=backend).user_files
+    assert reloaded.read("x.txt", "user2") == "x"
+
+    if not isinstance(backend, LocalDirBackend):
+        # Память и SQLite ':memory:' не создают на диске ни одного файла
+        assert list(tmp_path.iterdir()) == []
+
+
+def test_record_path_only_for_local_disk(backend):
+    fs = ProFileSystem(backend=backend)
+    fs.create("docs/a.txt", "a", "user1")
+    path = fs.user_files["user1"]["docs/a.txt"]["path"]
+    if isinstance(backend, LocalDirBackend):
+        assert path == str(backend.root / "user1" / "docs" / "a.txt")
+    else:
+        assert path is None
+
+
+@pytest.mark.parametrize("bad", ["", ".", "docs/", "/abs.txt", "../x.txt", "docs/../../x.txt"])
+def test_invalid_names_are_rejected(backend, bad):
+    fs = ProFileSystem(backend=backend)
+    assert not fs.create(bad, "x", "user1")
+    assert fs.browse("user1") == []
+
+
+def test_names_are_normalized_to_one_key(backend):
+    fs = ProFileSystem(backend=backend)
+    assert fs.create("./docs//a.txt", "a", "user1")
+
+    assert sorted(fs.user_files["user1"]) == ["docs/a.txt"]
+    assert fs.read("docs/a.txt", "user1") == "a"
+    assert _names(fs.browse("user1")) == [("docs", True)]
+    assert _names(fs.browse("user1", "docs/")) == [("a.txt", False)]
+    assert fs.delete("./docs/a.txt", "user1")
+    assert "user1" not in fs.user_files
+
+
+def test_list_does_not_leak_sibling_prefixes(backend):
+    for key in ("user1/a_%.txt", "user1/docs/b.txt", "user10/c.txt",
+                "user1-x/d.txt", "user1.e/f.txt"):
+        backend.write(key, b"x")
+
+    assert sorted((e.name, e.is_dir) for e in backend.list("user1")) == [
+        ("a_%.txt", False), ("docs", True)]
+
+    backend.remove_tree("user1")
+    assert backend.list("user1") == []
+    assert [e.name for e in backend.list("user10")] == ["c.txt"]
+    assert backend.exists("user1-x/d.txt") and backend.exists("user1.e/f.txt")